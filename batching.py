@@ -0,0 +1,60 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects requests from every session in the process and hands them to
+    `handler` in small batches: a batch is sent once it holds `max_batch`
+    distinct items, or `max_wait` seconds after its first item arrived.
+
+    `handler` receives a dict of short item IDs to payloads and must return a
+    dict with a result for each ID. Identical keys submitted while a batch is
+    filling share one slot, so they cost one item in the request.
+    """
+
+    def __init__(self, handler, executor, max_batch=8, max_wait=0.075):
+        self.handler = handler
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._dispatch, name="classify-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, payload):
+        """Queues one item and returns a Future for its result."""
+        future = Future()
+        self._queue.put((key, payload, future))
+        return future
+
+    def _dispatch(self):
+        while True:
+            first = self._queue.get()
+            batch = {first[0]: (first[1], [first[2]])}
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    key, payload, future = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.setdefault(key, (payload, []))[1].append(future)
+            self.executor.submit(self._run, batch)
+
+    def _run(self, batch):
+        ids = {str(i): key for i, key in enumerate(batch, start=1)}
+        try:
+            results = self.handler({item_id: batch[key][0] for item_id, key in ids.items()})
+        except Exception as e:
+            for _, futures in batch.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        for item_id, key in ids.items():
+            for future in batch[key][1]:
+                future.set_result(results[item_id])
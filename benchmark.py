@@ -0,0 +1,449 @@
+"""
+Headless load test and latency benchmark for the assessment flow.
+
+Drives complete wizard paths through app.py with Streamlit's AppTest harness,
+against a stub Gemini model with configurable latency and failure rate, and
+writes the measurements to a JSON file so runs can be compared over time.
+
+    python benchmark.py --users 8 --assessments 5 --gemini-latency 0.5 --output bench_results.json
+    python benchmark.py --compare bench_results.json   # exit 1 on regression
+
+It also counts the elements each page sends and exits 1 if a page goes over its
+budget in ELEMENT_BUDGETS.
+"""
+import argparse
+import importlib.machinery
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# "Other" answers: some the local classifier handles, some it doesn't, and repeats
+OTHER_TEXTS = [
+    "homesick", "too busy with classes", "idk", "breakup",
+    "my roommates and I just don't click", "I feel like I'm on the outside looking in",
+    "everything is fine on paper but something is missing", "I moved here for my spouse's job",
+]
+
+# Most elements (including containers and placeholders) each wizard step may render.
+# Every element is a separate delta for the server to serialize and the browser to
+# lay out on every run, so pages should stay at or below these counts. Steps 3 and 4
+# allow for all three "Other" text boxes being open.
+ELEMENT_BUDGETS = {0: 7, 1: 6, 2: 6, 3: 15, 4: 15, 5: 11, 88: 5, 99: 4}
+
+
+# -----------------------------------------------------------------------------
+# Stub Gemini
+# -----------------------------------------------------------------------------
+class StubGemini:
+    """Stands in for google.generativeai: sleeps, sometimes fails, answers [10] for every item."""
+
+    def __init__(self, latency, failure_rate):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def install(self):
+        stub = self
+
+        class Response:
+            def __init__(self, text):
+                self.text = text
+
+        class GenerativeModel:
+            def __init__(self, model_name, **kwargs):
+                pass
+
+            def generate_content(self, prompt, **kwargs):
+                with stub._lock:
+                    stub.calls += 1
+                time.sleep(random.uniform(0.5, 1.5) * stub.latency)
+                if random.random() < stub.failure_rate:
+                    with stub._lock:
+                        stub.failures += 1
+                    raise RuntimeError("stub Gemini failure")
+                ids = json.loads(prompt[prompt.rindex("\n{") + 1:])
+                return Response(json.dumps({item_id: [10] for item_id in ids}))
+
+        google = sys.modules.get("google") or types.ModuleType("google")
+        google.__path__ = getattr(google, "__path__", [])
+        genai = types.ModuleType("google.generativeai")
+        genai.__spec__ = importlib.machinery.ModuleSpec("google.generativeai", None)
+        genai.configure = lambda **kwargs: None
+        genai.GenerativeModel = GenerativeModel
+        google.generativeai = genai
+        sys.modules["google"] = google
+        sys.modules["google.generativeai"] = genai
+        os.environ["GOOGLE_API_KEY"] = "benchmark-stub-key"
+
+
+# -----------------------------------------------------------------------------
+# Simulated users
+# -----------------------------------------------------------------------------
+_script_runs = 0
+_script_runs_lock = threading.Lock()
+
+
+def count_script_runs():
+    """
+    Counts every execution of app.py, including the extra ones st.rerun() causes.
+    Those happen in a loop inside ScriptRunner._run_script, so the count is taken
+    around the function that executes the script code itself.
+    """
+    from streamlit.runtime.scriptrunner import script_runner
+
+    original = script_runner.exec_func_with_error_handling
+
+    def counted(func, ctx):
+        global _script_runs
+        with _script_runs_lock:
+            _script_runs += 1
+        return original(func, ctx)
+
+    script_runner.exec_func_with_error_handling = counted
+
+
+# AppTest swaps process-wide globals (the mock Runtime, config, secrets) around
+# every run, so runs from parallel users must not overlap. A real server also
+# executes scripts under one GIL; Gemini calls still overlap on the worker pool.
+_run_lock = threading.Lock()
+
+
+def count_elements(node):
+    """Counts a node of the AppTest element tree and everything inside it."""
+    children = getattr(node, "children", None)
+    if children is None:
+        return 1
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+class SimulatedUser:
+    """
+    One browser session. Steps 1 and 2 are forms, so choosing an answer there stays
+    in the browser. On steps 3 and 4 each question is a fragment, so every choice
+    (and typed "Other" text) is a round-trip that reruns that question.
+
+    AppTest can only run the whole script, so those fragment runs execute all of
+    app.py here: they are kept out of the script-run count and timed separately,
+    and their latency is an upper bound on what a browser sees.
+    """
+
+    def __init__(self, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.rerun_seconds = []
+        self.fragment_seconds = []
+        # Script executions that stood in for fragment runs
+        self.fragment_script_runs = 0
+        # Step -> most elements seen on that page
+        self.page_elements = {}
+
+    def run(self, widget=None, fragment=False):
+        with _run_lock:
+            with _script_runs_lock:
+                runs_before = _script_runs
+            started = time.perf_counter()
+            (widget or self.at).run()
+            elapsed = time.perf_counter() - started
+            if fragment:
+                self.fragment_seconds.append(elapsed)
+                with _script_runs_lock:
+                    self.fragment_script_runs += _script_runs - runs_before
+            else:
+                self.rerun_seconds.append(elapsed)
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+        step = self.step()
+        self.page_elements[step] = max(self.page_elements.get(step, 0), count_elements(self.at.main) - 1)
+
+    def step(self):
+        return self.at.session_state.step
+
+    def click(self):
+        self.run(self.at.button[0].click())
+
+    def choose(self, radio, index):
+        radio.set_value(radio.options[index])
+
+    def answer(self, q_id, index, other_text=None):
+        radio = self.at.radio(key=f"rad_{q_id}")
+        if other_text is None:
+            self.choose(radio, index)
+            self.run(fragment=True)
+        else:
+            self.choose(radio, len(radio.options) - 1)
+            self.run(fragment=True)
+            self.at.text_input(key=f"text_{q_id}").input(other_text)
+            self.run(fragment=True)
+
+    def start(self):
+        self.run()
+        self.click()
+
+    def self_path(self, answers):
+        self.start()
+        self.choose(self.at.radio[0], 0)
+        self.click()
+        self.choose(self.at.radio[0], 0)
+        self.click()
+        for q_id in ("q2", "q3", "q4"):
+            self.answer(q_id, *answers[q_id])
+        self.click()
+        for q_id in ("q5", "q6", "q7"):
+            self.answer(q_id, *answers[q_id])
+        self.click()
+        assert self.step() == 5, self.step()
+
+    def crisis_path(self):
+        self.start()
+        self.choose(self.at.radio[0], 0)
+        self.click()
+        self.choose(self.at.radio[0], 2)
+        self.click()
+        assert self.step() == 99, self.step()
+
+    def friend_path(self):
+        self.start()
+        self.choose(self.at.radio[0], 1)
+        self.click()
+        assert self.step() == 88, self.step()
+
+
+def random_answers(other):
+    answers = {q_id: (random.randrange(4), None) for q_id in ("q2", "q3", "q4", "q5", "q6", "q7")}
+    if other:
+        for q_id in random.sample(sorted(answers), 2):
+            answers[q_id] = (0, random.choice(OTHER_TEXTS))
+    return answers
+
+
+SCENARIOS = {
+    "standard": lambda user: user.self_path(random_answers(other=False)),
+    "other_text": lambda user: user.self_path(random_answers(other=True)),
+    "crisis": lambda user: user.crisis_path(),
+    "friend": lambda user: user.friend_path(),
+}
+
+
+def run_assessment(scenario, timeout):
+    user = SimulatedUser(timeout)
+    SCENARIOS[scenario](user)
+    return user
+
+
+# -----------------------------------------------------------------------------
+# Measurements
+# -----------------------------------------------------------------------------
+def summarize(seconds):
+    ordered = sorted(seconds)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def measure_scenarios(repeats, timeout):
+    """
+    Runs each path on its own and reports full script runs, fragment runs (round-trips
+    for each answer on steps 3 and 4), per-rerun latency and elements per page.
+    """
+    results = {}
+    for scenario in SCENARIOS:
+        rerun_seconds = []
+        fragment_seconds = []
+        client_reruns = 0
+        fragment_script_runs = 0
+        page_elements = {}
+        with _script_runs_lock:
+            runs_before = _script_runs
+        for _ in range(repeats):
+            user = run_assessment(scenario, timeout)
+            rerun_seconds.extend(user.rerun_seconds)
+            fragment_seconds.extend(user.fragment_seconds)
+            client_reruns += len(user.rerun_seconds)
+            fragment_script_runs += user.fragment_script_runs
+            for step, count in user.page_elements.items():
+                page_elements[step] = max(page_elements.get(step, 0), count)
+        with _script_runs_lock:
+            script_runs = _script_runs - runs_before - fragment_script_runs
+        results[scenario] = {
+            "client_reruns_per_assessment": client_reruns / repeats,
+            "script_runs_per_assessment": script_runs / repeats,
+            "fragment_runs_per_assessment": len(fragment_seconds) / repeats,
+            "rerun": summarize(rerun_seconds),
+            "fragment_rerun": summarize(fragment_seconds) if fragment_seconds else None,
+            "page_elements": {str(step): count for step, count in sorted(page_elements.items())},
+        }
+    return results
+
+
+def measure_memory(sessions, timeout):
+    """Memory still held per finished session, with every session kept alive."""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    users = [run_assessment("other_text", timeout) for _ in range(sessions)]
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del users
+    return {"sessions": sessions, "retained_bytes_per_session": retained / sessions}
+
+
+def measure_throughput(users, assessments, timeout):
+    """
+    N simulated users in parallel, each completing `assessments` mixed paths.
+    Their script runs take turns (see _run_lock), so this measures one worker process.
+    """
+    scenarios = list(SCENARIOS)
+    rerun_seconds = []
+    errors = []
+
+    def one_user(n):
+        for i in range(assessments):
+            try:
+                user = run_assessment(scenarios[(n + i) % len(scenarios)], timeout)
+                rerun_seconds.extend(user.rerun_seconds)
+            except Exception as e:
+                errors.append(repr(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(one_user, range(users)))
+    elapsed = time.perf_counter() - started
+    completed = users * assessments - len(errors)
+    return {
+        "users": users,
+        "assessments_completed": completed,
+        "errors": errors[:10],
+        "seconds": elapsed,
+        "assessments_per_second": completed / elapsed,
+        "rerun": summarize(rerun_seconds) if rerun_seconds else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(APP_PATH), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -----------------------------------------------------------------------------
+# Regression check
+# -----------------------------------------------------------------------------
+def check_element_budgets(scenarios, budgets=ELEMENT_BUDGETS):
+    """Returns a line for every page that rendered more elements than its budget."""
+    over = []
+    for scenario, data in scenarios.items():
+        for step, count in data["page_elements"].items():
+            budget = budgets.get(int(step))
+            if budget is not None and count > budget:
+                over.append(f"{scenario} step {step}: {count} elements (budget {budget})")
+    return over
+
+
+def compare(previous, current, tolerance):
+    """Returns a list of metrics that got worse than `previous` by more than `tolerance`."""
+    regressions = []
+
+    def check(name, old, new):
+        if old and new > old * (1 + tolerance):
+            regressions.append(f"{name}: {old:.2f} -> {new:.2f}")
+
+    for scenario, now in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(scenario)
+        if before:
+            check(f"{scenario} script runs/assessment", before["script_runs_per_assessment"], now["script_runs_per_assessment"])
+            check(f"{scenario} fragment runs/assessment", before.get("fragment_runs_per_assessment"), now["fragment_runs_per_assessment"])
+            check(f"{scenario} p95 rerun ms", before["rerun"]["p95_ms"], now["rerun"]["p95_ms"])
+    if previous.get("memory"):
+        check("bytes/session", previous["memory"]["retained_bytes_per_session"], current["memory"]["retained_bytes_per_session"])
+    if previous.get("throughput"):
+        old, new = previous["throughput"]["assessments_per_second"], current["throughput"]["assessments_per_second"]
+        if new < old * (1 - tolerance):
+            regressions.append(f"assessments/second: {old:.2f} -> {new:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--assessments", type=int, default=4, help="assessments per concurrent user")
+    parser.add_argument("--repeats", type=int, default=5, help="sequential runs of each path")
+    parser.add_argument("--memory-sessions", type=int, default=10, help="sessions kept alive for the memory check")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="mean stub Gemini latency in seconds")
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0, help="share of stub Gemini calls that fail")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds allowed per script run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file; exit 1 if this run regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    gemini = StubGemini(args.gemini_latency, args.gemini_failure_rate)
+    gemini.install()
+    count_script_runs()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "config": vars(args),
+        "scenarios": measure_scenarios(args.repeats, args.timeout),
+        "memory": measure_memory(args.memory_sessions, args.timeout),
+        "throughput": measure_throughput(args.users, args.assessments, args.timeout),
+    }
+    results["gemini"] = {"calls": gemini.calls, "failures": gemini.failures}
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    for scenario, data in results["scenarios"].items():
+        print(
+            f"{scenario:>10}: {data['script_runs_per_assessment']:.1f} script runs + "
+            f"{data['fragment_runs_per_assessment']:.1f} fragment runs/assessment, "
+            f"rerun p50 {data['rerun']['p50_ms']:.1f} ms, p95 {data['rerun']['p95_ms']:.1f} ms"
+        )
+    print(f"    memory: {results['memory']['retained_bytes_per_session'] / 1024:.0f} KiB retained per session")
+    print(
+        f"throughput: {results['throughput']['assessments_per_second']:.2f} assessments/s "
+        f"with {args.users} users ({len(results['throughput']['errors'])} errors)"
+    )
+    print(f"    gemini: {gemini.calls} calls, {gemini.failures} failures")
+    print(f"Results written to {args.output}")
+
+    failed = False
+    for line in check_element_budgets(results["scenarios"]):
+        print(f"OVER BUDGET {line}")
+        failed = True
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
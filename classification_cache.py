@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def make_key(q_id, text):
+    """
+    Normalizes a free-text answer into a cache key so that "Homesick " and
+    "homesick" for the same question share one classification.
+    """
+    return f"{q_id}:{' '.join(text.strip().lower().split())}"
+
+
+def make_namespace(*parts):
+    """
+    Fingerprint of everything that changes what the model would answer
+    (prompt template, model name). A new namespace means old entries are ignored.
+    """
+    digest = hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class ClassificationCache:
+    """
+    Process-wide LRU cache of 'Other' text classifications with a TTL.
+
+    If `path` is given, entries are also written to a small SQLite file so that
+    several Streamlit worker processes on the same machine can share results.
+    Entries are keyed by a digest of the normalized answer, in memory and on
+    disk, so the cache never holds the answer text itself.
+    """
+
+    def __init__(self, maxsize=2048, ttl=24 * 60 * 60, path=None, namespace=""):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS classifications ("
+                    " namespace TEXT NOT NULL, key TEXT NOT NULL,"
+                    " value TEXT NOT NULL, expires_at REAL NOT NULL,"
+                    " PRIMARY KEY (namespace, key))"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=1.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Returns the cached category list for `key`, or None on a miss."""
+        now = time.time()
+        digest = self._digest(key)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return list(value)
+                del self._entries[digest]
+
+        value = self._disk_get(digest, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(digest, value, now + self.ttl)
+        return list(value)
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        value = tuple(value)
+        digest = self._digest(key)
+        with self._lock:
+            self._store(digest, value, expires_at)
+        self._disk_set(digest, value, expires_at)
+
+    def invalidate(self, namespace=None):
+        """
+        Drops every cached classification, in memory and on disk. Pass a new
+        `namespace` when the prompt or model changes instead: entries from other
+        namespaces are deleted, and rows other workers have already written for
+        the new one are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if namespace is not None:
+                self.namespace = namespace
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    if namespace is None:
+                        conn.execute("DELETE FROM classifications")
+                    else:
+                        conn.execute("DELETE FROM classifications WHERE namespace != ?", (self.namespace,))
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+    def _store(self, digest, value, expires_at):
+        self._entries[digest] = (tuple(value), expires_at)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _digest(key):
+        # Answer text is never kept, in memory or on disk; only a digest of it is.
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _disk_get(self, digest, now):
+        if not self.path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM classifications WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (self.namespace, digest, now),
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        return tuple(json.loads(row[0])) if row else None
+
+    def _disk_set(self, digest, value, expires_at):
+        if not self.path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO classifications (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, digest, json.dumps(list(value)), expires_at),
+                )
+                conn.execute("DELETE FROM classifications WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error:
+            # The shared store is only an optimization; the in-memory copy still works.
+            pass
+
+
+def cache_from_env(namespace=""):
+    """Builds a cache configured from CLASSIFICATION_CACHE_* environment variables."""
+    return ClassificationCache(
+        maxsize=int(os.environ.get("CLASSIFICATION_CACHE_SIZE", 2048)),
+        ttl=float(os.environ.get("CLASSIFICATION_CACHE_TTL", 24 * 60 * 60)),
+        path=os.environ.get("CLASSIFICATION_CACHE_PATH") or None,
+        namespace=namespace,
+    )
@@ -0,0 +1,100 @@
+import html
+import json
+import os
+from collections import namedtuple
+from types import MappingProxyType
+
+CONTENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content.json")
+
+CATEGORY_IDS = range(1, 11)
+
+
+# Questionnaire and resource content, read-only and shared by every session.
+# The *_html fields hold pre-rendered page sections, each sent as a single element:
+# one per results category (heading and resource boxes) and one for both step-88 lists.
+Content = namedtuple("Content", [
+    "questions", "results", "helper_resources", "research_resources",
+    "results_html", "helper_html",
+])
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _require(condition, message):
+    if not condition:
+        raise ValueError(f"Invalid content: {message}")
+
+
+def _validate_resources(resources, where):
+    _require(isinstance(resources, list), f"{where} must be a list")
+    for res in resources:
+        for field in ("name", "url", "desc"):
+            _require(isinstance(res.get(field), str) and res[field], f"{where}: every resource needs a '{field}'")
+
+
+def validate(raw):
+    """Raises ValueError describing the first problem found in the raw content."""
+    for q_id, q in raw.get("questions", {}).items():
+        _require(isinstance(q.get("text"), str), f"question {q_id} needs 'text'")
+        _require(
+            len(q.get("options", [])) == len(q.get("keys", [])) > 0,
+            f"question {q_id} needs matching 'options' and 'keys'",
+        )
+    for q_id in ("q0", "q1", "q2", "q3", "q4", "q5", "q6", "q7"):
+        _require(q_id in raw.get("questions", {}), f"missing question {q_id}")
+
+    results = raw.get("results", {})
+    for group_id in CATEGORY_IDS:
+        data = results.get(str(group_id))
+        _require(data is not None, f"missing results for category {group_id}")
+        _require(isinstance(data.get("topic"), str), f"category {group_id} needs a 'topic'")
+        _validate_resources(data.get("resources"), f"category {group_id}")
+    _validate_resources(raw.get("helper_resources"), "helper_resources")
+    _validate_resources(raw.get("research_resources"), "research_resources")
+
+
+def render_resources(resources, link_text="Visit Website ->"):
+    """Builds the resource-box HTML for a list of resources as one block."""
+    return "".join(
+        f'<div class="resource-box"><div class="resource-title">{html.escape(res["name"])}</div>'
+        f'<div class="resource-desc">{html.escape(res["desc"])}</div>'
+        f'<a href="{html.escape(res["url"])}" target="_blank" class="resource-link">{link_text}</a></div>'
+        for res in resources
+    )
+
+
+def render_section(title, resources, link_text="Visit Website ->"):
+    """A heading followed by its resource boxes, as one block."""
+    return f'<h3>{html.escape(title)}</h3>{render_resources(resources, link_text)}'
+
+
+def load_content(path=CONTENT_PATH):
+    """Reads and validates the content file and pre-renders its HTML."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    validate(raw)
+
+    results = {int(group_id): data for group_id, data in raw["results"].items()}
+    return Content(
+        questions=_freeze(raw["questions"]),
+        results=_freeze(results),
+        helper_resources=_freeze(raw["helper_resources"]),
+        research_resources=_freeze(raw["research_resources"]),
+        results_html=MappingProxyType({
+            group_id: render_section(
+                f"It looks like you may be navigating {data['topic']}. Here are some resources for you:",
+                data["resources"],
+            )
+            for group_id, data in results.items()
+        }),
+        helper_html=(
+            render_section("Resources to Share or Use", raw["helper_resources"])
+            + render_section("Deep Dive: The Science of Connection", raw["research_resources"], link_text="Read Article ->")
+        ),
+    )
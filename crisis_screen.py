@@ -0,0 +1,110 @@
+import re
+
+# Deliberately broad: a false alarm shows someone the crisis resources page, a miss
+# could leave them without it. Negations ("I'm not suicidal") still match on purpose.
+# Ambiguous words only count with context, so "end it with my girlfriend", "in danger
+# of failing" and "hurt my feelings" don't throw away someone's results page.
+PEOPLE = (
+    r"(him|her|them|someone|somebody|people|others|everyone|"
+    r"my (roommates?|mom|dad|mother|father|parents?|brother|sister|siblings?|family|"
+    r"wife|husband|spouse|girlfriend|boyfriend|partner|ex|friends?|kids?|child|baby|son|daughter|"
+    r"professor|teacher|boss|classmates?|coworkers?|neighbou?rs?))"
+)
+# Things people "hurt" that aren't people: "it hurt her feelings", "hurt my trust"
+NOT_PEOPLE = r"(?! (feelings|trust|chances|pride|grades?|reputation|ego))"
+
+CRISIS_PATTERNS = [
+    r"suicid\w*",
+    r"kill(ing)? my ?self", r"kms", r"kys", r"unalive\w*",
+    r"end(ing)? my (own )?life", r"end(ing)? it all", r"take my (own )?life",
+    r"(want|wanna|going|ready|plan|planning|thinking about|think about|thinking of|think of|just) (to )?end(ing)? (it|everything|things)(?! with)",
+    r"(not|isnt|is not|aint) worth living", r"never (been )?born", r"(miss|notice) me if i (was|were) gone",
+    r"(want|wanna|going|ready|plan|planning) (to )?die", r"feel(ing)? like dying", r"wish i (was|were) dead",
+    r"(want|wanna) (to )?be dead", r"better off dead", r"better off without me",
+    r"(dont|do not|no longer|never) want to (live|be alive|be here|exist|wake up)",
+    r"no (reason|point) (in |to )?(living|live|go on|going on)",
+    r"(want|wanna|wish i could|going to|just) (to )?disappear( forever)?",
+    r"(hurt|harm|cut|burn|hurting|harming|cutting|burning) my ?self", r"self ?harm\w*",
+    r"cutting again", r"(been|started|start|keep|still) cutting",
+    r"overdos\w*", r"hang my ?self", r"jump off",
+    r"(hurt|kill|harm|shoot|stab|hurting|killing) " + PEOPLE + NOT_PEOPLE,
+    r"(im|i am) (not safe|unsafe)", r"(dont|do not|never) feel safe",
+    r"(not safe|unsafe) (at home|around|with|in my (home|house|apartment|room|relationship))",
+    r"in (immediate |physical )?danger(?! of)",
+    r"can ?(not|t) (go on|keep going|do this anymore|take it anymore)",
+    r"give up on (life|living|everything)",
+]
+
+_PATTERN = re.compile(r"\b(?:" + "|".join(CRISIS_PATTERNS) + r")\b")
+
+# Recall check (python crisis_screen.py): every MUST_FLAG line has to match and no
+# MUST_NOT_FLAG line may. Add to both lists whenever the patterns change.
+MUST_FLAG = [
+    "I don't feel safe",
+    "I'm not safe at home",
+    "i feel like dying",
+    "I've been cutting again",
+    "I want to disappear",
+    "I want to die",
+    "thinking about suicide",
+    "I want to kill myself",
+    "I don't want to be here anymore",
+    "I just want to end it",
+    "life isn't worth living",
+    "life is not worth living anymore",
+    "thinking of ending it",
+    "thinking about ending things",
+    "I wish I was never born",
+    "nobody would miss me if I was gone",
+    "I want to end it all",
+    "everyone would be better off without me",
+    "no point in living",
+    "I keep hurting myself",
+    "self-harm",
+    "I took too many pills, maybe an overdose",
+    "I want to hurt my roommate",
+    "I'm going to hurt someone",
+    "I'm in danger",
+    "I can't go on",
+    "kms",
+]
+MUST_NOT_FLAG = [
+    "homesick",
+    "Im killing it in classes",
+    "end of semester stress",
+    "my roommate hurt my feelings",
+    "my ex hurt my trust",
+    "I decided to end it with my girlfriend",
+    "I'm in danger of failing chem",
+    "I feel unsafe sharing my opinions",
+    "it hurt her feelings when I left",
+    "I'm cutting back on caffeine",
+    "my friends disappeared after freshman year",
+    "I moved on from my ex",
+]
+
+
+def _normalize(text):
+    # "Don't" -> "dont", punctuation -> spaces, so one pattern covers the usual spellings
+    text = text.lower().replace("'", "").replace("’", "")
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", text).split())
+
+
+def is_crisis(text):
+    """
+    True if free text contains crisis or self-harm language. Runs locally in
+    microseconds, so it never waits on the network.
+    """
+    return bool(text) and _PATTERN.search(_normalize(text)) is not None
+
+
+if __name__ == "__main__":
+    missed = [text for text in MUST_FLAG if not is_crisis(text)]
+    false_alarms = [text for text in MUST_NOT_FLAG if is_crisis(text)]
+    for text in missed:
+        print(f"MISSED: {text}")
+    for text in false_alarms:
+        print(f"FALSE ALARM: {text}")
+    print(f"{len(MUST_FLAG) - len(missed)}/{len(MUST_FLAG)} flagged, "
+          f"{len(false_alarms)}/{len(MUST_NOT_FLAG)} false alarms")
+    raise SystemExit(1 if missed or false_alarms else 0)
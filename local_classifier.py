@@ -0,0 +1,142 @@
+import re
+
+import crisis_screen
+
+# Answers at or above this confidence are trusted without asking Gemini.
+CONFIDENCE_THRESHOLD = 0.5
+
+# Phrases that point at each category. Matching is on whole words after
+# lowercasing and stripping punctuation, so "Home-sick!" still hits "home sick".
+# Crisis/Safety (1) is detected by crisis_screen instead. Words that are common in
+# unrelated answers ("work", "down", "moved", "fit in") only appear inside longer
+# phrases, so "I moved on" or "work is fine" don't produce a confident wrong answer.
+CATEGORY_LEXICON = {
+    2: [
+        "invisible", "misunderstood", "nobody understands", "no one understands", "no one gets me",
+        "nobody gets me", "not understood", "unseen", "nobody cares", "no one cares", "lonely",
+        "loneliness", "alone", "surface level", "shallow", "no deep", "no real connection",
+        "no close friends", "no one to talk to",
+    ],
+    3: [
+        "homesick", "home sick", "miss home", "missing home", "miss my family", "new here",
+        "new to campus", "new to college", "new to byu", "new to provo", "new to the area",
+        "new to school", "new to the us", "new to the country", "new to this school",
+        "new student", "freshman", "first year", "transfer student", "transferred",
+        "just moved", "moved here", "moved to", "adjusting", "adjustment", "new city", "new school", "far from home",
+        "just got here", "returned missionary", "back from my mission",
+    ],
+    4: [
+        "anxious", "anxiety", "nervous", "shy", "awkward", "introvert", "introverted",
+        "scared to talk", "afraid to talk", "judged", "judgment", "judgement", "panic",
+        "social anxiety", "say the wrong thing", "embarrassed", "insecure",
+    ],
+    5: [
+        "breakup", "break up", "broke up", "broken up", "dumped", "divorce", "divorced",
+        "died", "passed away", "death", "funeral", "grief", "grieving", "lost my", "loss",
+        "my ex", "ex girlfriend", "ex boyfriend", "drifted", "drifted apart", "friends left",
+        "left on a mission", "left on missions", "moved away", "heartbroken", "heartbreak",
+    ],
+    6: [
+        "gay", "lesbian", "bisexual", "lgbt", "lgbtq", "queer", "trans", "transgender",
+        "minority", "outsider", "dont fit in", "do not fit in", "don't fit in", "never fit in",
+        "dont belong", "don't belong", "do not belong", "belonging", "different from everyone",
+        "international student", "my race", "my culture", "culture shock", "faith crisis",
+        "not religious", "not lds", "not a member", "left the church", "hide who i am",
+        "be myself",
+    ],
+    7: [
+        "busy", "too busy", "burnout", "burned out", "burnt out", "overwhelmed", "exhausted",
+        "always tired", "so tired", "drained", "no time", "stressed", "stress", "workload",
+        "too many classes", "too much homework", "too much work", "work and school",
+        "working too much", "two jobs", "full time job", "finals", "deadlines",
+    ],
+    8: [
+        "depressed", "depression", "sad", "sadness", "hopeless", "empty inside", "feel empty",
+        "numb", "heaviness", "no motivation", "unmotivated", "cant get out of bed",
+        "can't get out of bed", "worthless", "nothing matters", "crying", "feeling down",
+        "feel down", "so down",
+    ],
+    9: [
+        "social media", "instagram", "tiktok", "snapchat", "facebook", "compare", "comparing",
+        "comparison", "everyone else", "fomo", "missing out", "not good enough", "inadequate",
+        "jealous", "envy",
+    ],
+    10: [
+        "idk", "i dont know", "i don't know", "dont know", "don't know", "not sure", "unsure",
+        "dunno", "no idea", "nothing", "n a", "none",
+    ],
+}
+
+# Words that carry no signal on their own; they don't count against confidence.
+STOPWORDS = frozenset(
+    "a an and are am as at be been but by can could do does for from get got had has have "
+    "i im i'm in is it its just me my myself of on or really so some that the them then "
+    "there they this to too very was we were with you your feel feeling feels lot like "
+    "kind sort bit little much more most".split()
+)
+
+NEGATIONS = frozenset("not no never dont don't isnt isn't arent aren't wasnt wasn't".split())
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split())
+
+
+def _compile(phrases):
+    normalized = sorted({_normalize(p) for p in phrases}, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(re.escape(p) for p in normalized) + r")\b")
+
+
+_PATTERNS = {category: _compile(phrases) for category, phrases in CATEGORY_LEXICON.items()}
+
+
+def classify(text):
+    """
+    Maps one free-text answer onto category IDs using the lexicon above.
+
+    Returns (categories, confidence). Confidence is the share of meaningful
+    words in the answer that the matched phrases account for, halved when the
+    answer contains a negation the lexicon can't see past ("not anxious"), and
+    halved again when it points at more than one category.
+    An empty category list always comes with 0.0 confidence, and crisis
+    language always returns ([1], 1.0).
+    """
+    normalized = _normalize(text)
+    if not normalized:
+        return [], 0.0
+    if crisis_screen.is_crisis(text):
+        return [1], 1.0
+
+    hits = {}
+    matched_words = set()
+    for category, pattern in _PATTERNS.items():
+        for match in pattern.finditer(normalized):
+            hits[category] = hits.get(category, 0) + 1
+            start = normalized.count(" ", 0, match.start())
+            matched_words.update(range(start, start + match.group(0).count(" ") + 1))
+
+    if not hits:
+        return [], 0.0
+
+    words = normalized.split(" ")
+    content = [i for i, word in enumerate(words) if word not in STOPWORDS]
+    if not content:
+        content = list(range(len(words)))
+    confidence = sum(1 for i in content if i in matched_words) / len(content)
+
+    if any(words[i] in NEGATIONS and i not in matched_words for i in range(len(words))):
+        confidence /= 2
+
+    # "Unsure" only counts when nothing else matched
+    if len(hits) > 1:
+        hits.pop(10, None)
+    # Several categories at once is a mixed answer; less likely the lexicon has it right
+    if len(hits) > 1:
+        confidence /= 2
+
+    categories = sorted(hits, key=lambda category: -hits[category])[:3]
+    return categories, confidence
+
+
+def is_confident(confidence):
+    return confidence >= CONFIDENCE_THRESHOLD
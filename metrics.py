@@ -0,0 +1,164 @@
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upper bounds of the tokens-per-request histogram buckets
+TOKEN_BUCKETS = (100, 200, 400, 800, 1600, 3200, 6400)
+
+HELP = {
+    "app_reruns_total": "Script runs, by wizard step and run type (full, or fragment for one question).",
+    "app_step_render_seconds": "Time to run the script or fragment, by wizard step and run type.",
+    "gemini_requests_total": "Batched classification requests sent to Gemini.",
+    "gemini_request_seconds": "Gemini request latency, including retries.",
+    "gemini_batch_items": "Answers per Gemini request.",
+    "gemini_errors_total": "Gemini requests that failed after all retries.",
+    "gemini_rejected_total": "Gemini requests skipped because the circuit breaker was open.",
+    "gemini_timeouts_total": "Answers the results page stopped waiting for.",
+    "gemini_invalid_items_total": "Answers whose Gemini categories were malformed or out of range.",
+    "gemini_prompt_tokens_total": "Prompt tokens sent to Gemini.",
+    "gemini_output_tokens_total": "Output tokens returned by Gemini.",
+    "gemini_request_tokens": "Prompt plus output tokens per Gemini request.",
+    "local_classifier_total": "'Other' answers seen by the local classifier, by outcome.",
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Process-wide, aggregate-only metrics: counters, histograms and gauges read at
+    scrape time. Labels are limited to fixed values such as the step number, so
+    nothing a user typed or chose can end up in here.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets)
+            self._histograms[key].observe(value)
+
+    def gauge(self, name, read):
+        """Registers `read()`, which returns a number, or a dict of numbers by field."""
+        with self._lock:
+            self._gauges[name] = read
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: {
+                    "buckets": dict(zip([str(b) for b in h.buckets] + ["+Inf"], h.counts)),
+                    "sum": h.sum,
+                    "count": h.count,
+                }
+                for key, h in self._histograms.items()
+            }
+            gauges = dict(self._gauges)
+
+        result = {"counters": [], "histograms": [], "gauges": {}}
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].append({"name": name, "labels": dict(labels), "value": value})
+        for (name, labels), data in sorted(histograms.items()):
+            result["histograms"].append({"name": name, "labels": dict(labels), **data})
+        for name, read in sorted(gauges.items()):
+            try:
+                result["gauges"][name] = read()
+            except Exception:
+                result["gauges"][name] = None
+        return result
+
+    def prometheus(self):
+        """The snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        def label_text(labels, **extra):
+            labels = {**labels, **extra}
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+        for c in snapshot["counters"]:
+            header(c["name"], "counter")
+            lines.append(f"{c['name']}{label_text(c['labels'])} {c['value']}")
+        for h in snapshot["histograms"]:
+            header(h["name"], "histogram")
+            cumulative = 0
+            for bound, count in h["buckets"].items():
+                cumulative += count
+                lines.append(f"{h['name']}_bucket{label_text(h['labels'], le=bound)} {cumulative}")
+            lines.append(f"{h['name']}_sum{label_text(h['labels'])} {h['sum']}")
+            lines.append(f"{h['name']}_count{label_text(h['labels'])} {h['count']}")
+        for name, value in snapshot["gauges"].items():
+            values = value if isinstance(value, dict) else {"": value}
+            for field, number in values.items():
+                if isinstance(number, (int, float)):
+                    metric = f"{name}_{field}" if field else name
+                    header(metric, "gauge")
+                    lines.append(f"{metric} {number}")
+        return "\n".join(lines) + "\n"
+
+
+def serve(metrics, port, host="127.0.0.1"):
+    """
+    Serves /metrics (Prometheus text) and /metrics.json on a background thread.
+    Binds to localhost by default so only local scrapers can read it.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = metrics.prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(metrics.snapshot()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
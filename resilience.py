@@ -0,0 +1,113 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the service while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Process-wide breaker around an unreliable service.
+
+    Failures and slow calls within the last `window` seconds are counted; once
+    there are `failure_threshold` of them the breaker opens and every call is
+    refused for `cooldown` seconds. After that a single trial call is let
+    through ("half-open"): success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=5, window=60.0, cooldown=30.0, slow_call=8.0):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.slow_call = slow_call
+        self.state = "closed"
+        self.opened_at = None
+        self.total_failures = 0
+        self.total_rejections = 0
+        self._failures = deque()
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Returns True if a call may go ahead right now."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._trial_running = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.total_rejections += 1
+            return False
+
+    def is_open(self):
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.cooldown
+
+    def record_success(self, duration):
+        if duration >= self.slow_call:
+            self.record_failure()
+            return
+        with self._lock:
+            if self.state != "closed":
+                logger.warning("Circuit breaker closed after a successful trial call")
+            self.state = "closed"
+            self._trial_running = False
+            self._failures.clear()
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            self.total_failures += 1
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window:
+                self._failures.popleft()
+            if self.state == "half_open" or len(self._failures) >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Circuit breaker opened for %.0fs", self.cooldown)
+                self.state = "open"
+                self.opened_at = now
+                self._trial_running = False
+
+    def snapshot(self):
+        """Current state for monitoring."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "recent_failures": len(self._failures),
+                "total_failures": self.total_failures,
+                "total_rejections": self.total_rejections,
+                "seconds_until_retry": (
+                    max(0.0, self.cooldown - (time.monotonic() - self.opened_at)) if self.state == "open" else 0.0
+                ),
+            }
+
+
+def call_with_retries(func, breaker, retries=2, base_delay=0.5, max_delay=4.0):
+    """
+    Calls `func()` up to `retries + 1` times with full-jitter exponential backoff,
+    reporting each attempt to `breaker`. Raises CircuitOpenError without calling
+    `func` while the breaker is open, and re-raises the last error otherwise.
+    """
+    for attempt in range(retries + 1):
+        if not breaker.allow():
+            raise CircuitOpenError("Service temporarily disabled after repeated failures")
+        started = time.monotonic()
+        try:
+            result = func()
+        except Exception:
+            breaker.record_failure()
+            if attempt == retries:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+        else:
+            breaker.record_success(time.monotonic() - started)
+            return result
@@ -0,0 +1,193 @@
+import itertools
+from array import array
+
+# The rule-based half of the triage, in priority order.
+# Each rule is (category ID, exclusive, answers that trigger it). A rule fires
+# if ANY of its answers was given. An exclusive rule that fires replaces every
+# other match (Safety First).
+RULES = [
+    # 1. CRISIS CASE (Safety First) - Exclusive
+    (1, True, [("q1", "C")]),
+    # 2. Chronic / Clinical Struggle
+    (8, False, [("q4", "A"), ("q5", "B")]),
+    # 3. Situational / Grief
+    (5, False, [("q2", "C"), ("q4", "C"), ("q3", "E")]),
+    # 4. Social Anxiety
+    (4, False, [("q2", "D"), ("q3", "C"), ("q5", "C")]),
+    # 5. Identity Isolated
+    (6, False, [("q2", "E")]),
+    # 6. Burnout
+    (7, False, [("q3", "D")]),
+    # 7. Freshman / Isolation
+    (3, False, [("q2", "B"), ("q4", "B")]),
+    # 8. Emotional Loneliness
+    (2, False, [("q2", "A"), ("q7", "A")]),
+    # 9. Comparison Trap
+    (9, False, [("q6", "A")]),
+]
+
+
+def legacy_matches(answers):
+    """
+    Frozen copy of the if-chain the app used before RULES existed. Kept only so
+    `python rules.py` can prove the table still gives the same answers; don't
+    edit it when RULES changes.
+    """
+    matches = []
+
+    # 1. CRISIS CASE (Safety First) - Exclusive
+    if answers.get('q1') == 'C':
+        return (1,)
+
+    # 2. Chronic / Clinical Struggle
+    if answers.get('q4') == 'A' or answers.get('q5') == 'B':
+        matches.append(8)
+
+    # 3. Situational / Grief
+    if answers.get('q2') == 'C' or answers.get('q4') == 'C' or answers.get('q3') == 'E':
+        matches.append(5)
+
+    # 4. Social Anxiety
+    if answers.get('q2') == 'D' or answers.get('q3') == 'C' or answers.get('q5') == 'C':
+        matches.append(4)
+
+    # 5. Identity Isolated
+    if answers.get('q2') == 'E':
+        matches.append(6)
+
+    # 6. Burnout
+    if answers.get('q3') == 'D':
+        matches.append(7)
+
+    # 7. Freshman / Isolation
+    if answers.get('q2') == 'B' or answers.get('q4') == 'B':
+        matches.append(3)
+
+    # 8. Emotional Loneliness
+    if answers.get('q2') == 'A' or answers.get('q7') == 'A':
+        matches.append(2)
+
+    # 9. Comparison Trap
+    if answers.get('q6') == 'A':
+        matches.append(9)
+
+    return tuple(matches)
+
+
+class RuleEngine:
+    """
+    Compiles RULES into bitmasks and precomputes the result for every possible
+    set of answers, so evaluating a session is one table index.
+
+    Every answer key a rule mentions (e.g. q2=A) gets one bit, and each rule is
+    the mask of its trigger bits. Any other answer, including 'OTHER' and no
+    answer, sets no bits, so per question they all share slot 0. Free text is
+    handled separately by the AI analysis.
+    """
+
+    def __init__(self, rules=RULES):
+        self.rules = rules
+        self.exclusive = {category for category, exclusive, _ in rules if exclusive}
+        self.question_ids = sorted({q_id for _, _, triggers in rules for q_id, _ in triggers})
+
+        self._slots = {q_id: {} for q_id in self.question_ids}
+        for _, _, triggers in rules:
+            for q_id, key in triggers:
+                self._slots[q_id].setdefault(key, len(self._slots[q_id]) + 1)
+        bits = {}
+        for q_id in self.question_ids:
+            for key in self._slots[q_id]:
+                bits[(q_id, key)] = 1 << len(bits)
+        self._rule_masks = []
+        for category, exclusive, triggers in rules:
+            mask = 0
+            for trigger in triggers:
+                mask |= bits[trigger]
+            self._rule_masks.append((category, exclusive, mask))
+
+        self._strides = {}
+        size = 1
+        for q_id in reversed(self.question_ids):
+            self._strides[q_id] = size
+            size *= len(self._slots[q_id]) + 1
+        self._answer_bits = {
+            q_id: [0] + [bits[(q_id, key)] for key in self._slots[q_id]] for q_id in self.question_ids
+        }
+
+        # Results are stored as the set of fired rules, decoded through a small dict
+        self._results = {}
+        self._table = array('L', self._build_table(size))
+
+    def _fired(self, answer_mask):
+        fired = 0
+        for index, (_, exclusive, mask) in enumerate(self._rule_masks):
+            if answer_mask & mask:
+                if exclusive:
+                    return 1 << index
+                fired |= 1 << index
+        return fired
+
+    def _build_table(self, size):
+        table = [0] * size
+        slot_ranges = [range(len(self._slots[q_id]) + 1) for q_id in self.question_ids]
+        for index, slots in enumerate(itertools.product(*slot_ranges)):
+            answer_mask = 0
+            for q_id, slot in zip(self.question_ids, slots):
+                answer_mask |= self._answer_bits[q_id][slot]
+            fired = self._fired(answer_mask)
+            if fired not in self._results:
+                self._results[fired] = tuple(
+                    category for i, (category, _, _) in enumerate(self._rule_masks) if fired >> i & 1
+                )
+            table[index] = fired
+        return table
+
+    def __len__(self):
+        return len(self._table)
+
+    def evaluate(self, answers):
+        """Returns the rule-based categories for `answers`, in rule priority order."""
+        index = 0
+        for q_id in self.question_ids:
+            index += self._slots[q_id].get(answers.get(q_id), 0) * self._strides[q_id]
+        return self._results[self._table[index]]
+
+    def evaluate_direct(self, answers):
+        """Evaluates RULES one by one without the table, as a reference for checking it."""
+        matches = []
+        for category, exclusive, triggers in self.rules:
+            if any(answers.get(q_id) == key for q_id, key in triggers):
+                if exclusive:
+                    return (category,)
+                matches.append(category)
+        return tuple(matches)
+
+    def verify(self, question_keys, reference=None):
+        """
+        Checks the table against evaluate_direct for every possible combination of
+        answers (each question's keys, plus no answer), and against `reference`
+        (a function of the answers, e.g. legacy_matches) if given. Returns the
+        number checked.
+        """
+        choices = [[None] + list(question_keys[q_id]) for q_id in self.question_ids]
+        checked = 0
+        for combo in itertools.product(*choices):
+            answers = {q_id: key for q_id, key in zip(self.question_ids, combo) if key is not None}
+            result = self.evaluate(answers)
+            if result != self.evaluate_direct(answers):
+                raise ValueError(f"Rule table disagrees with RULES for {answers}")
+            if reference is not None and result != reference(answers):
+                raise ValueError(f"Rule table disagrees with the reference for {answers}")
+            checked += 1
+        return checked
+
+
+if __name__ == "__main__":
+    # python rules.py: exhaustive check of the precomputed table against RULES and
+    # the legacy if-chain, for every combination of the answer keys in content.json
+    from content import load_content
+
+    engine = RuleEngine()
+    question_keys = {q_id: q["keys"] for q_id, q in load_content().questions.items()}
+    checked = engine.verify(question_keys, reference=legacy_matches)
+    print(f"{len(engine)} table entries; {checked} answer combinations match RULES and the legacy if-chain")
@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+UNANSWERED = "-"
+NONCE_BYTES = 8
+TAG_BYTES = 16
+
+
+class SessionCodec:
+    """
+    Packs wizard progress (the step and the chosen option keys) into a short
+    encrypted and signed token, so any server process holding the same secret can
+    rebuild the session. Each answer is one character, the index of the chosen key
+    in its question, but the token is opaque without the secret: the payload is
+    XORed with an HMAC-SHA256 keystream under a random nonce, then authenticated
+    (encrypt-then-MAC). Typed 'Other' text is never included.
+    """
+
+    def __init__(self, questions, secret, max_age=86400):
+        self.question_ids = list(questions)
+        self.keys = {q_id: list(q['keys']) for q_id, q in questions.items()}
+        # Tokens are tied to the questionnaire they were made for, so editing
+        # content.json invalidates old ones instead of mapping them to the wrong options
+        layout = ";".join(f"{q_id}:{','.join(keys)}" for q_id, keys in self.keys.items())
+        master = hashlib.sha256(f"{secret}\n{layout}".encode("utf-8")).digest()
+        self.encryption_key = hmac.new(master, b"encrypt", hashlib.sha256).digest()
+        self.signing_key = hmac.new(master, b"sign", hashlib.sha256).digest()
+        self.max_age = max_age
+
+    def _keystream(self, nonce, length):
+        blocks = []
+        for counter in range((length + 31) // 32):
+            blocks.append(hmac.new(self.encryption_key, nonce + counter.to_bytes(4, "big"), hashlib.sha256).digest())
+        return b"".join(blocks)[:length]
+
+    def _tag(self, data):
+        return hmac.new(self.signing_key, data, hashlib.sha256).digest()[:TAG_BYTES]
+
+    def encode(self, step, answers, now=None):
+        chars = []
+        for q_id in self.question_ids:
+            key = answers.get(q_id)
+            chars.append(UNANSWERED if key is None else _base36(self.keys[q_id].index(key)))
+        issued = _base36(int(time.time() if now is None else now))
+        payload = f"{step}.{''.join(chars)}.{issued}".encode("ascii")
+
+        nonce = os.urandom(NONCE_BYTES)
+        sealed = nonce + bytes(a ^ b for a, b in zip(payload, self._keystream(nonce, len(payload))))
+        return base64.urlsafe_b64encode(sealed + self._tag(sealed)).decode("ascii").rstrip("=")
+
+    def decode(self, token, now=None):
+        """Returns (step, answers), or None if the token is malformed, forged or expired."""
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            sealed, tag = raw[:-TAG_BYTES], raw[-TAG_BYTES:]
+            if len(sealed) <= NONCE_BYTES or not hmac.compare_digest(tag, self._tag(sealed)):
+                return None
+            nonce, ciphertext = sealed[:NONCE_BYTES], sealed[NONCE_BYTES:]
+            payload = bytes(a ^ b for a, b in zip(ciphertext, self._keystream(nonce, len(ciphertext))))
+            step, chars, issued = payload.decode("ascii").split(".")
+            if self.max_age and (time.time() if now is None else now) - int(issued, 36) > self.max_age:
+                return None
+            if len(chars) != len(self.question_ids):
+                return None
+            answers = {}
+            for q_id, char in zip(self.question_ids, chars):
+                if char != UNANSWERED:
+                    answers[q_id] = self.keys[q_id][int(char, 36)]
+            return int(step), answers
+        except (ValueError, IndexError, UnicodeDecodeError):
+            return None
+
+
+def _base36(number):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    text = ""
+    while True:
+        number, remainder = divmod(number, 36)
+        text = digits[remainder] + text
+        if not number:
+            return text
@@ -0,0 +1,25 @@
+// Loaded once per page (the element that includes it never changes between reruns).
+// Adds the stylesheet, then scrolls back to the top whenever the wizard changes page,
+// which the app signals through the data-page attribute of #top_of_page.
+(function () {
+    if (window.connectionGuideLoaded) {
+        return;
+    }
+    window.connectionGuideLoaded = true;
+
+    var style = document.createElement("link");
+    style.rel = "stylesheet";
+    style.href = "./app/static/style.css";
+    document.head.appendChild(style);
+
+    var page = null;
+    new MutationObserver(function () {
+        var anchor = document.getElementById("top_of_page");
+        if (anchor && anchor.dataset.page !== page) {
+            if (page !== null) {
+                anchor.scrollIntoView({behavior: "instant", block: "start"});
+            }
+            page = anchor.dataset.page;
+        }
+    }).observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ["data-page"]});
+})();